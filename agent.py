@@ -14,6 +14,8 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from agent_client import AnthropicAgentClient
+from collectors import title_tokens as _tokens
+from publishers import host_of
 
 
 def _extract_json(text: str) -> str:
@@ -55,10 +57,6 @@ def _anthropic_client():
 
 
 
-def _tokens(s: str) -> set:
-    s = re.sub(r"[^a-z0-9 ]+", " ", (s or "").lower())
-    return {w for w in s.split() if len(w) > 2}
-
 def _overlap(a: set, b: set) -> float:
     if not a or not b:
         return 0.0
@@ -87,10 +85,12 @@ def _first_sentence(s: str) -> str:
 
 
 
+def _item_host(it: Dict) -> str:
+    """Publisher host (see publishers.resolve_publishers), else the link's host."""
+    return it.get("host") or host_of(it.get("link", ""))
+
+
 def cluster_for_trace(items: List[Dict]) -> List[Dict]:
-    def _host(url: str) -> str:
-        m = re.search(r"https?://([^/]+)", (url or "").lower())
-        return m.group(1) if m else ""
 
     candidates = items[:12]
     title_tokens = [_tokens(it["title"]) for it in candidates]
@@ -116,14 +116,14 @@ def cluster_for_trace(items: List[Dict]) -> List[Dict]:
             {
                 "rep": {
                     "title": rep["title"],
-                    "url": rep.get("link", ""),
-                    "host": _host(rep.get("link", "")),
+                    "url": rep.get("canonical") or rep.get("link", ""),
+                    "host": _item_host(rep),
                 },
                 "members": [
                     {
                         "title": g["title"],
-                        "url": g.get("link", ""),
-                        "host": _host(g.get("link", "")),
+                        "url": g.get("canonical") or g.get("link", ""),
+                        "host": _item_host(g),
                     }
                     for g in group
                 ],
@@ -179,22 +179,16 @@ def _heuristic_pick_one(domain: str, scored_items: List[Dict[str, Any]]) -> Dict
     confidence = _confidence_from_rumor(top.get("rumor_score", 0.0))
 
     seen, sources = set(), []
-    top_host = ""
-    m = re.search(r"https?://([^/]+)", (top.get("link", "") or "").lower())
-    if m:
-        top_host = m.group(1)
+    top_host = _item_host(top)
 
     for g in scored_items:
         if g.get("title") in seen:
             continue
-        same_host = False
-        gm = re.search(r"https?://([^/]+)", (g.get("link", "") or "").lower())
-        if gm and top_host and gm.group(1) == top_host:
-            same_host = True
+        same_host = bool(top_host) and _item_host(g) == top_host
         similar = _jaccard(title, g.get("title", "")) >= 0.5
         if same_host or similar:
             seen.add(g["title"])
-            sources.append({"title": g["title"], "url": g.get("link", "")})
+            sources.append({"title": g["title"], "url": g.get("canonical") or g.get("link", "")})
         if len(sources) == 3:
             break
 
@@ -203,7 +197,8 @@ def _heuristic_pick_one(domain: str, scored_items: List[Dict[str, Any]]) -> Dict
         "summary": _make_summary(title, snippet),
         "rationale": rationale,
         "confidence": confidence,
-        "sources": sources or [{"title": title, "url": top.get("link", "")}],
+        "sources": sources or [{"title": title, "url": top.get("canonical") or top.get("link", "")}],
+        "variant": "heuristic",
     }
 
 
@@ -321,7 +316,7 @@ def pick_one(domain: str, scored_items: List[Dict[str, Any]]) -> Dict[str, Any]:
             chosen  = scored_items[idx]
             title   = chosen.get("title", "(untitled)")
             snippet = chosen.get("summary", "")
-            sources = [{"title": title or "link", "url": chosen.get("link","")}]
+            sources = [{"title": title or "link", "url": chosen.get("canonical") or chosen.get("link","")}]
         else:
             title   = (msg.get("title") or "(untitled)").strip()
             snippet = ""
@@ -341,6 +336,7 @@ def pick_one(domain: str, scored_items: List[Dict[str, Any]]) -> Dict[str, Any]:
             "rationale": rationale or _rationale(f"{title} {snippet}"),
             "confidence": conf,
             "sources": sources,
+            "variant": "agent",
         }
 
         print(f"[agent] used Claude for domain={domain}")
@@ -0,0 +1,26 @@
+# atomicio.py
+# Crash-safe file replacement shared by the digest writer and the JSON stores
+# (feed stats, publisher cache): readers see the old file or the new one, never
+# a partial write.
+import os
+import tempfile
+
+
+def atomic_write(path, text: str) -> None:
+    """Write text to a temp file next to `path`, fsync it, then swap it in with os.replace."""
+    path = os.fspath(path)
+    d = os.path.dirname(path) or "."
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,324 @@
+# classifier.py
+# Hashed word n-gram linear model (hashing trick + NumPy weights) for rumor
+# likelihood and per-domain fit, trained from the labeled history in artifacts/.
+#
+#   python classifier.py train                 # artifacts/*.raw.json, *.dropped.json, *.md -> artifacts/classifier.npz
+#   python classifier.py score "Apple reportedly in talks to buy ..."
+#
+# Labels (each head is trained only on rows that carry a label for it):
+#   domain d  — items in YYYY-MM-DD.raw.json under d are positives; items
+#               filter_by_domain dropped for d (YYYY-MM-DD.dropped.json) are
+#               negatives. Only keyword-filtered rows count ("filter" field):
+#               rows the classifier itself kept or dropped would train the
+#               model on its own output.
+#   rumor     — only days where the agent (not the keyword heuristic) made the
+#               pick: linked items are positives, the other candidates it was
+#               shown (top 15 by rumor_score) are negatives.
+# The most recent day(s) are held out and reported; weights are only written
+# once there are --min-days days of history. Heads lacking either class are
+# saved as untrained, and ranker.py keeps the keyword rules for them.
+import argparse
+import glob
+import json
+import os
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+from config import CLASSIFIER_PATH, CLASSIFIER_BITS
+
+_tok_re = re.compile(r"[a-z0-9]+")
+_url_re = re.compile(r"https?://[^\s)\]]+")
+_variant_re = re.compile(r"<!--\s*section=(\S+)\s+variant=(\S+)\s*-->")
+# rationale prefixes written by agent._rationale, i.e. a heuristic (keyword) pick
+_HEURISTIC_RATIONALE = ("Keyword signals:", "Language suggests speculation")
+_AGENT_SHOWN = 15  # candidates pick_one shows the agent
+
+
+def _features(text: str, bits: int) -> Dict[int, float]:
+    """Hashed unigrams + bigrams (crc32, stable across processes), L2-normalised counts."""
+    toks = _tok_re.findall((text or "").lower())
+    grams = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+    mask = (1 << bits) - 1
+    feats: Dict[int, float] = {}
+    for g in grams:
+        h = zlib.crc32(g.encode()) & mask
+        feats[h] = feats.get(h, 0.0) + 1.0
+    norm = sum(v * v for v in feats.values()) ** 0.5 or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+
+def _sparse(texts: Sequence[str], bits: int):
+    """Rows of hashed features as flat (row, col, val) arrays, a cheap stand-in for CSR."""
+    rows, cols, vals = [], [], []
+    for i, t in enumerate(texts):
+        for c, v in _features(t, bits).items():
+            rows.append(i)
+            cols.append(c)
+            vals.append(v)
+    return (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+            np.asarray(vals, dtype=np.float32))
+
+
+def _sigmoid(z):
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class HashedLinearModel:
+    """Weights W (2**bits × heads) and bias b (heads); head 0 is "rumor", the rest are domains.
+
+    `trained[j]` is False for heads whose training rows lacked positives or
+    negatives; callers fall back to the keyword rules for those heads.
+    """
+
+    def __init__(self, W, b, heads: List[str], bits: int, trained: Optional[Sequence[bool]] = None):
+        self.W, self.b, self.heads, self.bits = W, b, list(heads), bits
+        self.trained = [bool(t) for t in trained] if trained is not None else [True] * len(self.heads)
+
+    def usable(self, head: str) -> bool:
+        return head in self.heads and self.trained[self.heads.index(head)]
+
+    @property
+    def domains(self) -> List[str]:
+        """Domain heads that learned from both classes."""
+        return [h for h in self.heads[1:] if self.usable(h)]
+
+    def predict(self, texts: Sequence[str]):
+        """Probabilities, shape (len(texts), heads), computed for the whole batch at once."""
+        n = len(texts)
+        out = np.zeros((n, len(self.heads)), dtype=np.float32)
+        if n:
+            rows, cols, vals = _sparse(texts, self.bits)
+            np.add.at(out, rows, self.W[cols] * vals[:, None])
+        return _sigmoid(out + self.b)
+
+    def rumor(self, texts: Sequence[str]):
+        return self.predict(texts)[:, 0]
+
+    def domain_fit(self, texts: Sequence[str], domain: str):
+        return self.predict(texts)[:, self.heads.index(domain)]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, W=self.W.astype(np.float16), b=self.b,
+                            heads=np.asarray(self.heads), bits=np.asarray(self.bits),
+                            trained=np.asarray(self.trained))
+
+
+def load_model(path: str = CLASSIFIER_PATH) -> Optional[HashedLinearModel]:
+    """Load weights; None when NumPy is missing or the file does not exist.
+
+    Files written before heads were checked for both classes carry no
+    "trained" flags; every head in them is treated as untrained (retrain).
+    """
+    if np is None or not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        heads = [str(h) for h in z["heads"]]
+        trained = z["trained"] if "trained" in z.files else [False] * len(heads)
+        return HashedLinearModel(z["W"].astype(np.float32), z["b"].astype(np.float32),
+                                 heads, int(z["bits"]), trained)
+
+
+def _agent_picks(md_path: str) -> Dict[str, set]:
+    """{domain: linked urls} for digest sections picked by the agent rather than the heuristic."""
+    if not os.path.exists(md_path):
+        return {}
+    sections: Dict[str, Dict] = {}
+    cur = None
+    with open(md_path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("## "):
+                cur = sections.setdefault(line[3:].strip().lower(), {"urls": set(), "agent": None})
+                continue
+            if cur is None:
+                continue
+            m = _variant_re.search(line)
+            if m:
+                cur["agent"] = m.group(2) == "agent"
+            elif line.startswith("*Why it looks like a rumor:*") and cur["agent"] is None:
+                # digests written before every section carried a variant comment
+                why = line.split(":*", 1)[1].strip()
+                cur["agent"] = not why.startswith(_HEURISTIC_RATIONALE)
+            cur["urls"].update(_url_re.findall(line))
+    return {d: sec["urls"] for d, sec in sections.items() if sec["agent"] and sec["urls"]}
+
+
+def _filtered_by(it: Dict) -> str:
+    """The domain filter that produced a dumped item; dumps that predate the
+    "filter" field only carry "domain_fit" when the classifier filtered them."""
+    return it.get("filter") or ("classifier" if "domain_fit" in it else "keywords")
+
+
+def load_history(artifacts: str = "artifacts") -> Tuple[List[str], List[str], List[Dict[str, float]]]:
+    """(texts, dates, labels) from every YYYY-MM-DD.raw.json + .dropped.json + digest.
+
+    labels[i] maps head name -> target for the heads row i is labeled for.
+    Domain labels come from keyword-filtered rows only.
+    """
+    texts, dates, labels = [], [], []
+
+    def add(text: str, date: str, lab: Dict[str, float]):
+        texts.append(text)
+        dates.append(date)
+        labels.append(lab)
+
+    for raw_path in sorted(glob.glob(os.path.join(artifacts, "*.raw.json"))):
+        stem = raw_path[: -len(".raw.json")]
+        date = os.path.basename(stem)
+        agent = _agent_picks(stem + ".md")
+        with open(raw_path, encoding="utf-8") as f:
+            dump = json.load(f)
+        how = {d: _filtered_by(items[0]) for d, items in dump.items() if items}
+        for d, items in dump.items():
+            shown = sorted(items, key=lambda it: it.get("rumor_score", 0.0), reverse=True)[:_AGENT_SHOWN]
+            shown_ids = {id(it) for it in shown}
+            picked = agent.get(d)
+            for it in items:
+                lab = {d: 1.0} if _filtered_by(it) == "keywords" else {}
+                if picked is not None:
+                    if it.get("link") in picked or (it.get("canonical") or "") in picked:
+                        lab["rumor"] = 1.0
+                    elif id(it) in shown_ids:
+                        lab["rumor"] = 0.0
+                if lab:
+                    add(f'{it.get("title","")} {it.get("summary","")}', date, lab)
+        if os.path.exists(stem + ".dropped.json"):
+            with open(stem + ".dropped.json", encoding="utf-8") as f:
+                for d, items in json.load(f).items():
+                    for it in items:
+                        if (it.get("filter") or how.get(d, "keywords")) == "keywords":
+                            add(f'{it.get("title","")} {it.get("summary","")}', date, {d: 0.0})
+    return texts, dates, labels
+
+
+def _targets(labels: Sequence[Dict[str, float]], heads: List[str]):
+    """Dense targets Y and mask M (1 where the row is labeled for that head)."""
+    Y = np.zeros((len(labels), len(heads)), dtype=np.float32)
+    M = np.zeros_like(Y)
+    for i, lab in enumerate(labels):
+        for h, v in lab.items():
+            j = heads.index(h)
+            Y[i, j], M[i, j] = v, 1.0
+    return Y, M
+
+
+def train(texts: Sequence[str], labels: Sequence[Dict[str, float]], heads: List[str],
+          bits: int = CLASSIFIER_BITS, epochs: int = 300, lr: float = 2.0, l2: float = 1e-3) -> HashedLinearModel:
+    """Full-batch gradient descent on per-head logistic loss over labeled rows only.
+
+    Heads without both positive and negative rows are marked untrained.
+    """
+    Y, M = _targets(labels, heads)
+    trained = ((Y * M).sum(axis=0) > 0) & (((1 - Y) * M).sum(axis=0) > 0)
+    rows, cols, vals = _sparse(texts, bits)
+    W = np.zeros((1 << bits, len(heads)), dtype=np.float32)
+    b = np.zeros(len(heads), dtype=np.float32)
+    n = np.maximum(M.sum(axis=0), 1.0)             # labeled rows per head
+    for _ in range(epochs):
+        Z = np.zeros_like(Y)
+        np.add.at(Z, rows, W[cols] * vals[:, None])
+        err = (_sigmoid(Z + b) - Y) * M / n         # (rows, heads)
+        G = np.zeros_like(W)
+        np.add.at(G, cols, err[rows] * vals[:, None])
+        W -= lr * (G + l2 * W)
+        b -= lr * err.sum(axis=0)
+    return HashedLinearModel(W, b, heads, bits, trained)
+
+
+def evaluate(model: HashedLinearModel, texts: Sequence[str], labels: Sequence[Dict[str, float]]) -> Dict[str, Dict]:
+    """Per-head accuracy / precision / recall at 0.5 over the rows labeled for that head."""
+    out = {}
+    if not texts:
+        return out
+    Y, M = _targets(labels, model.heads)
+    P = model.predict(texts) >= 0.5
+    for j, h in enumerate(model.heads):
+        m = M[:, j] > 0
+        if not m.any():
+            continue
+        y, p = Y[m, j] > 0.5, P[m, j]
+        tp = int((y & p).sum())
+        out[h] = {
+            "n": int(m.sum()), "pos": int(y.sum()),
+            "acc": float((y == p).mean()),
+            "precision": tp / max(1, int(p.sum())),
+            "recall": tp / max(1, int(y.sum())),
+        }
+    return out
+
+
+def _report(title: str, metrics: Dict[str, Dict]) -> None:
+    print(title)
+    if not metrics:
+        print("  (no labeled rows)")
+    for h, r in metrics.items():
+        note = "  (single class: metrics are not meaningful)" if r["pos"] in (0, r["n"]) else ""
+        print(f"  {h:<10} n={r['n']:<5} pos={r['pos']:<5} acc={r['acc']:.2f} "
+              f"precision={r['precision']:.2f} recall={r['recall']:.2f}{note}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Hashed n-gram rumor/domain classifier")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train", help="train from artifacts/*.raw.json, *.dropped.json and *.md")
+    t.add_argument("--artifacts", default="artifacts")
+    t.add_argument("--out", default=CLASSIFIER_PATH)
+    t.add_argument("--bits", type=int, default=CLASSIFIER_BITS, help="hash space = 2**bits features")
+    t.add_argument("--epochs", type=int, default=300)
+    t.add_argument("--holdout-days", type=int, default=1, help="most recent days held out for evaluation")
+    t.add_argument("--min-days", type=int, default=14, help="refuse to write weights with fewer days of history")
+    t.add_argument("--force", action="store_true", help="write weights even below --min-days")
+    s = sub.add_parser("score", help="score texts with a trained weight file")
+    s.add_argument("texts", nargs="+")
+    s.add_argument("--model", default=CLASSIFIER_PATH)
+    args = ap.parse_args()
+
+    if np is None:
+        raise SystemExit("numpy is required: pip install numpy")
+
+    if args.cmd == "train":
+        texts, dates, labels = load_history(args.artifacts)
+        if not texts:
+            raise SystemExit(f"no labeled history under {args.artifacts}/ (*.raw.json)")
+        days = sorted(set(dates))
+        held = set(days[-args.holdout_days:]) if 0 < args.holdout_days < len(days) else set()
+        tr = [i for i, d in enumerate(dates) if d not in held]
+        te = [i for i, d in enumerate(dates) if d in held]
+        heads = ["rumor"] + sorted({h for lab in labels for h in lab if h != "rumor"})
+        pick = lambda xs, idx: [xs[i] for i in idx]  # noqa: E731
+
+        model = train(pick(texts, tr), pick(labels, tr), heads, bits=args.bits, epochs=args.epochs)
+        print(f"{len(days)} days, {len(tr)} train rows, {len(te)} held-out rows "
+              f"({', '.join(sorted(held)) or 'none: need at least 2 days'})")
+        _report("train:", evaluate(model, pick(texts, tr), pick(labels, tr)))
+        _report("held-out:", evaluate(model, pick(texts, te), pick(labels, te)))
+
+        if len(days) < args.min_days and not args.force:
+            raise SystemExit(f"only {len(days)} days of history (< --min-days {args.min_days}); "
+                             "not writing weights (use --force to override)")
+        # final weights use every day, the held-out numbers above estimate their quality
+        model = train(texts, labels, heads, bits=args.bits, epochs=args.epochs)
+        untrained = [h for h, ok in zip(model.heads, model.trained) if not ok]
+        if untrained:
+            print(f"untrained (need positives and negatives; keyword fallback): {', '.join(untrained)}")
+        if len(untrained) == len(model.heads):
+            raise SystemExit("no head has both classes; not writing weights")
+        model.save(args.out)
+        print(f"[write] {args.out} ({os.path.getsize(args.out) // 1024} KiB)")
+    else:
+        model = load_model(args.model)
+        if model is None:
+            raise SystemExit(f"no model at {args.model}; run: python classifier.py train")
+        for text, row in zip(args.texts, model.predict(args.texts)):
+            scores = ", ".join(f"{h}={p:.2f}" for h, p in zip(model.heads, row))
+            print(f"{scores}  {text[:80]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import feedparser, hashlib, time, re, html
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from config import FETCH_CONCURRENCY, FETCH_TIMEOUT, PARSE_BATCH
+from publishers import strip_publisher
 
 _tag_re = re.compile(r"<[^>]+>")
 _ws_re = re.compile(r"\s+")
@@ -12,30 +15,153 @@ def _strip_html(s: str) -> str:
     s = _ws_re.sub(" ", s).strip()    # collapse whitespace
     return s
 
-def fetch_feed(url: str) -> List[Dict]:
-    d = feedparser.parse(url)
-    items = []
+def _iter_entries(d, url: str) -> Iterator[Dict]:
     for e in d.entries[:100]:
         title = getattr(e, "title", "") or ""
         link = getattr(e, "link", "") or ""
         summary = getattr(e, "summary", "") or ""
         if not title or not link:
             continue
-        items.append({
+        src = getattr(e, "source", None) or {}
+        yield {
             "title": title.strip(),
             "link": link.strip(),
             "summary": _strip_html(summary),
             "published": getattr(e, "published", ""),
-            "source": (getattr(d, "feed", {}) or {}).get("title", url)
-        })
-    return items
+            "source": (getattr(d, "feed", {}) or {}).get("title", url),
+            # Google News <source url="...">Publisher</source>; empty for most other feeds
+            "publisher": (src.get("title") or "").strip(),
+            "publisher_url": (src.get("href") or src.get("url") or "").strip(),
+            "feed": url,
+        }
+
+def feed_error(d) -> str:
+    """Why a feedparser result is faulty: an HTTP status >= 300 or the parser's bozo exception; '' if neither."""
+    status = d.get("status")
+    if status and status >= 300:
+        return f"HTTP {status}"
+    if d.get("bozo"):
+        return f"bozo: {type(d.get('bozo_exception')).__name__}"
+    return ""
+
+def iter_feed(url: str, errors: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    d = feedparser.parse(url)
+    if errors is not None and feed_error(d):
+        errors[url] = feed_error(d)
+    return _iter_entries(d, url)
+
+def fetch_feed(url: str) -> List[Dict]:
+    return list(iter_feed(url))
+
+# --- split collector: threaded I/O stage (raw bytes) + process-pool parse stage ---
+
+# Field order of the compact tuples workers send back (cheaper to pickle than dicts).
+ENTRY_FIELDS = ("title", "link", "summary", "published", "source", "publisher", "publisher_url", "feed")
 
-def collect_from_sources(urls: List[str], cap: int) -> List[Dict]:
+def download(url: str, timeout: float = FETCH_TIMEOUT) -> Tuple[str, bytes, str]:
+    """I/O only: return (url, body bytes, error). Non-2xx and network failures give b"" + error."""
+    import requests
+    try:
+        r = requests.get(url, timeout=timeout, headers={"User-Agent": "rumor-mill/1.0"})
+    except Exception as e:
+        return url, b"", type(e).__name__
+    if r.status_code >= 300:
+        return url, b"", f"HTTP {r.status_code}"
+    return url, r.content, ""
+
+def _parse_batch(batch: List[Tuple[str, bytes]]) -> List[Tuple[str, List[tuple], str]]:
+    """CPU stage (runs in a worker process): feedparser + _strip_html on raw documents.
+
+    A document that fails to parse yields ([], error) instead of failing the batch;
+    one feedparser only partly understood keeps its entries and notes feed_error.
+    """
     out = []
+    for url, data in batch:
+        try:
+            d = feedparser.parse(data) if data else None
+            entries = _iter_entries(d, url) if d is not None else ()
+            rows = [tuple(it[f] for f in ENTRY_FIELDS) for it in entries]
+            out.append((url, rows, feed_error(d) if d is not None else ""))
+        except Exception as e:
+            out.append((url, [], f"parse: {type(e).__name__}"))
+    return out
+
+def collect_parallel(urls: List[str], cap: int, parse_workers: Optional[int] = None,
+                     io_workers: int = FETCH_CONCURRENCY, batch: int = PARSE_BATCH, timeout: float = FETCH_TIMEOUT,
+                     timings: Optional[Dict[str, float]] = None,
+                     errors: Optional[Dict[str, str]] = None) -> Dict[str, List[Dict]]:
+    """Download feeds on a thread pool and parse them in batches on a process pool.
+
+    Returns {url: entries[:cap]} in the order of `urls`; feeds that failed to
+    download or parse map to []. Batches are dispatched as downloads complete,
+    so parsing overlaps the network wait. If `timings` is given it receives
+    each feed's download time in seconds; if `errors` is given it receives
+    url -> reason for every feed that failed or parsed with errors (feed_error).
+    """
+    def _timed(u: str):
+        t0 = time.perf_counter()
+        try:
+            return download(u, timeout)
+        finally:
+            if timings is not None:
+                timings[u] = time.perf_counter() - t0
+
+    results: Dict[str, List[Dict]] = {u: [] for u in urls}
+    with ThreadPoolExecutor(max_workers=max(1, io_workers)) as io, \
+            ProcessPoolExecutor(max_workers=parse_workers) as cpu:
+        parsing, buf = [], []
+        for fut in as_completed([io.submit(_timed, u) for u in dict.fromkeys(urls)]):
+            url, data, err = fut.result()
+            if not data:
+                if err and errors is not None:
+                    errors[url] = err
+                continue
+            buf.append((url, data))
+            if len(buf) >= batch:
+                parsing.append(cpu.submit(_parse_batch, buf))
+                buf = []
+        if buf:
+            parsing.append(cpu.submit(_parse_batch, buf))
+        for fut in as_completed(parsing):
+            for url, rows, err in fut.result():
+                results[url] = [dict(zip(ENTRY_FIELDS, r)) for r in rows[:cap]]
+                if err and errors is not None:
+                    errors[url] = err
+    return results
+
+def iter_from_sources(urls: Iterable[str], cap: int, errors: Optional[Dict[str, str]] = None) -> Iterator[Dict]:
+    """Yield up to `cap` entries from `urls`, one at a time; faulty feeds are noted in `errors`."""
+    n = 0
+    if cap <= 0:
+        return
     for u in urls:
-        out.extend(fetch_feed(u))
+        for it in iter_feed(u, errors):
+            yield it
+            n += 1
+            if n >= cap:
+                return
         time.sleep(0.3)  # be polite
-    return out[:cap]
+
+_title_norm_re = re.compile(r"[^a-z0-9]+")
+
+def _norm_title(title: str) -> str:
+    """Lower-case title without the ' - Publisher' suffix and punctuation."""
+    t = strip_publisher(title)
+    return _title_norm_re.sub(" ", t.lower()).strip()
 
 def make_id(item: Dict) -> str:
+    # A resolved publisher URL identifies the article regardless of which feed
+    # (and which redirect link) it arrived through; failing that, the publisher
+    # host plus the normalised title does.
+    canonical = item.get("canonical")
+    if canonical:
+        return hashlib.md5(canonical.encode()).hexdigest()
+    host = item.get("host")
+    if host:
+        return hashlib.md5(f"{host}|{_norm_title(item['title'])}".encode()).hexdigest()
     return hashlib.md5((item["title"] + item["link"]).encode()).hexdigest()
+
+def title_tokens(s: str) -> set:
+    """Word set (len > 2) used for title similarity in clustering and stream_top_k."""
+    s = re.sub(r"[^a-z0-9 ]+", " ", (s or "").lower())
+    return {w for w in s.split() if len(w) > 2}
@@ -46,3 +46,32 @@ DOMAIN_EXCLUDES = {
 }
 SUPPRESS_DUP_SUMMARY = True
 BAD_DOMAINS = set()
+
+# --- Publisher resolution for Google News redirect links (publishers.py) ---
+PUBLISHER_CACHE_PATH = os.getenv("PUBLISHER_CACHE_PATH", "artifacts/publishers.cache.json")
+PUBLISHER_CACHE_MAX = int(os.getenv("PUBLISHER_CACHE_MAX", "5000"))
+RESOLVE_PUBLISHERS = os.getenv("RESOLVE_PUBLISHERS", "true").lower() in {"1", "true", "yes", "y"}
+RESOLVE_CONCURRENCY = int(os.getenv("RESOLVE_CONCURRENCY", "8"))
+RESOLVE_TIMEOUT = float(os.getenv("RESOLVE_TIMEOUT", "5"))
+RESOLVE_RETRY_HOURS = float(os.getenv("RESOLVE_RETRY_HOURS", "24"))  # cooldown before retrying a failed link
+
+# --- User-defined topic profiles (profiles.py); used with --profiles ---
+PROFILES_PATH = os.getenv("PROFILES_PATH", "profiles.json")
+PROFILE_TOP_K = int(os.getenv("PROFILE_TOP_K", "15"))
+
+# --- Split collector (collectors.collect_parallel); used with --parse-workers ---
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "15"))
+PARSE_BATCH = int(os.getenv("PARSE_BATCH", "8"))
+
+# --- Per-feed yield stats + adaptive polling (feedstats.py); used with --adaptive ---
+FEEDSTATS_PATH = os.getenv("FEEDSTATS_PATH", "artifacts/feedstats.json")
+FEEDSTATS_HISTORY = int(os.getenv("FEEDSTATS_HISTORY", "30"))          # runs kept per feed
+FEEDSTATS_MIN_RUNS = int(os.getenv("FEEDSTATS_MIN_RUNS", "3"))         # warm-up before a feed can back off
+FEEDSTATS_MAX_BACKOFF_DAYS = int(os.getenv("FEEDSTATS_MAX_BACKOFF_DAYS", "7"))
+FEEDSTATS_MIN_CAP = int(os.getenv("FEEDSTATS_MIN_CAP", "5"))           # smallest per-feed share of MAX_ITEMS
+
+# --- Hashed n-gram linear classifier (classifier.py); used with --classifier ---
+CLASSIFIER_PATH = os.getenv("CLASSIFIER_PATH", "artifacts/classifier.npz")
+CLASSIFIER_BITS = int(os.getenv("CLASSIFIER_BITS", "16"))
+CLASSIFIER_DOMAIN_MIN = float(os.getenv("CLASSIFIER_DOMAIN_MIN", "0.5"))  # min domain-fit probability to keep
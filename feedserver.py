@@ -0,0 +1,272 @@
+# feedserver.py
+# Local stand-in RSS/Atom server for load and fault testing the collector
+# without touching Google News / HN.
+#
+#   python feedserver.py serve --port 8765
+#   python feedserver.py loadtest --feeds 200 --concurrency 16 --faults p5xx=0.05,timeout=0.02
+#   python feedserver.py loadtest --feeds 200 --concurrency 16 --parse-workers 4
+#
+# Every response is shaped by query parameters, e.g.
+#   /feed?n=50&size=400&format=atom&latency=0.2&status=503&drip=0.05&malformed=1&hang=30
+import argparse
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+_WORDS = (
+    "ai model chip startup market stock fed yield research study lab genome "
+    "reportedly leak insider rumor sources say unconfirmed deal merger launch "
+    "openai anthropic google meta nasdaq earnings physics space superconductor"
+).split()
+_PUBLISHERS = [("Example Wire", "https://wire.example.com"), ("Sample Times", "https://times.example.org"),
+               ("Demo Daily", "https://daily.example.net"), ("Test Post", "https://post.example.io")]
+
+FAULTS = ("ok", "p304", "p5xx", "timeout", "drip", "malformed")
+
+
+def _text(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(n_words))
+
+
+def render_feed(n: int, size: int, fmt: str = "rss", seed: int = 0, base: str = "http://127.0.0.1") -> str:
+    """Deterministic feed with `n` entries and roughly `size` bytes of HTML summary each."""
+    rng = random.Random(seed)
+    now = time.time()
+    entries = []
+    for i in range(n):
+        name, site = _PUBLISHERS[i % len(_PUBLISHERS)]
+        title = f"{_text(rng, 8).capitalize()} - {name}"
+        body = ""
+        while len(body) < size:
+            body += f"<p>{_text(rng, 12)} &amp; <b>{_text(rng, 3)}</b>&nbsp;</p> "
+        link = f"{base}/article/{seed}/{i}"
+        date = formatdate(now - i * 60, usegmt=True)
+        if fmt == "atom":
+            entries.append(
+                f"<entry><title>{escape(title)}</title><link href=\"{link}\"/><id>{link}</id>"
+                f"<updated>{time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now - i * 60))}</updated>"
+                f"<summary type=\"html\">{escape(body)}</summary></entry>"
+            )
+        else:
+            entries.append(
+                f"<item><title>{escape(title)}</title><link>{link}</link><pubDate>{date}</pubDate>"
+                f"<description>{escape(body)}</description><source url=\"{site}\">{name}</source></item>"
+            )
+    if fmt == "atom":
+        return ("<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+                "<feed xmlns=\"http://www.w3.org/2005/Atom\"><title>rumor-mill synthetic feed</title>"
+                + "".join(entries) + "</feed>")
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?><rss version=\"2.0\"><channel>"
+            "<title>rumor-mill synthetic feed</title>" + "".join(entries) + "</channel></rss>")
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):  # keep load tests quiet
+        pass
+
+    def do_GET(self):
+        try:
+            self._serve()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (timeout fault, load test teardown)
+
+    def _serve(self):
+        q = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+        num = lambda k, d: float(q.get(k, d))  # noqa: E731
+
+        time.sleep(num("latency", 0))
+        if q.get("hang"):
+            time.sleep(num("hang", 0))  # longer than the client timeout → client-side timeout
+        status = int(q.get("status", 200))
+        if status == 304:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if status >= 400:
+            body = b"synthetic error"
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        fmt = q.get("format", "rss")
+        xml = render_feed(int(num("n", 30)), int(num("size", 300)), fmt, int(num("seed", 0)),
+                          base=f"http://{self.headers.get('Host', '127.0.0.1')}")
+        if q.get("malformed"):
+            xml = xml[: int(len(xml) * 0.6)] + "<item><title>broken &bogus; <unclosed>"
+        body = xml.encode("utf-8")
+        ctype = "application/atom+xml" if fmt == "atom" else "application/rss+xml"
+        self.send_response(200)
+        self.send_header("Content-Type", f"{ctype}; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        drip = num("drip", 0)
+        if not drip:
+            self.wfile.write(body)
+            return
+        for i in range(0, len(body), 1024):  # slow-drip body
+            self.wfile.write(body[i:i + 1024])
+            self.wfile.flush()
+            time.sleep(drip)
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Start the feed server on a daemon thread; port 0 picks a free port."""
+    srv = ThreadingHTTPServer((host, port), FeedHandler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _parse_faults(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        k, _, v = part.partition("=")
+        k = k.strip()
+        if k not in FAULTS:
+            raise SystemExit(f"unknown fault {k!r}; choose from {', '.join(FAULTS[1:])}")
+        rates[k] = float(v or 0)
+    return rates
+
+
+def build_domains(base: str, feeds: int, n: int, size: int, latency: float, faults: Dict[str, float],
+                  timeout: float, seed: int = 0) -> List[Tuple[str, str]]:
+    """Return [(fault, url)] for `feeds` synthetic feeds, each assigned a fault by rate."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(feeds):
+        r, fault = rng.random(), "ok"
+        for name, rate in faults.items():
+            if r < rate:
+                fault = name
+                break
+            r -= rate
+        url = f"{base}/feed?n={n}&size={size}&seed={i}&latency={latency}"
+        if i % 2:
+            url += "&format=atom"
+        url += {
+            "ok": "",
+            "p304": "&status=304",
+            "p5xx": f"&status={rng.choice((500, 502, 503))}",
+            "timeout": f"&hang={timeout * 3}",
+            "drip": "&drip=0.05",
+            "malformed": "&malformed=1",
+        }[fault]
+        out.append((fault, url))
+    return out
+
+
+def _pct(xs: List[float], p: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p / 100.0 * (len(xs) - 1))))]
+
+
+def loadtest(args) -> None:
+    from collectors import collect_parallel, iter_feed
+
+    srv = start_server(port=args.port)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    plan = build_domains(base, args.feeds, args.entries, args.size, args.latency,
+                         _parse_faults(args.faults), args.timeout)
+    urls = [u for _, u in plan]
+    fault_of = {u: f for f, u in plan}
+
+    t0 = time.perf_counter()
+    if args.parse_workers:
+        # the --parse-workers collector: threaded download + process-pool parse
+        timings, errors = {}, {}
+        got = collect_parallel(urls, cap=args.entries, parse_workers=args.parse_workers,
+                               io_workers=args.concurrency, timeout=args.timeout,
+                               timings=timings, errors=errors)
+        results = [(fault_of[u], timings.get(u, 0.0), len(got[u]), errors.get(u, "")) for u in urls]
+    else:
+        # the default collector: feedparser fetches the URL itself and never raises;
+        # faults surface as its HTTP status or bozo exception (collectors.feed_error)
+        socket.setdefaulttimeout(args.timeout)  # feedparser's urllib fetch honours this
+
+        def one(url):
+            fault = fault_of[url]
+            errs = {}
+            t1 = time.perf_counter()
+            try:
+                n = sum(1 for _ in iter_feed(url, errs))
+            except Exception as e:
+                n, errs[url] = 0, type(e).__name__
+            return fault, time.perf_counter() - t1, n, errs.get(url, "")
+
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as ex:
+            results = list(ex.map(one, urls))
+    wall = time.perf_counter() - t0
+    srv.shutdown()
+
+    lat = [r[1] for r in results]
+    items = sum(r[2] for r in results)
+    mode = f"collect_parallel parse_workers={args.parse_workers}" if args.parse_workers else "fetch_feed"
+    print(f"{mode} feeds={len(results)} concurrency={args.concurrency} wall={wall:.2f}s")
+    print(f"throughput: {len(results) / wall:.1f} feeds/s, {items / wall:.0f} entries/s")
+    print(f"latency: p50={_pct(lat, 50) * 1000:.0f}ms p95={_pct(lat, 95) * 1000:.0f}ms "
+          f"p99={_pct(lat, 99) * 1000:.0f}ms max={max(lat, default=0) * 1000:.0f}ms")
+    print("by fault:        feeds  entries  empty  errors  p95(ms)  error kinds")
+    for fault in FAULTS:
+        rows = [r for r in results if r[0] == fault]
+        if not rows:
+            continue
+        kinds = Counter(r[3] for r in rows if r[3])
+        print(f"  {fault:<12} {len(rows):>6} {sum(r[2] for r in rows):>8} "
+              f"{sum(1 for r in rows if r[2] == 0):>6} {sum(1 for r in rows if r[3]):>7} "
+              f"{_pct([r[1] for r in rows], 95) * 1000:>8.0f}  "
+              f"{', '.join(f'{k} ×{v}' for k, v in kinds.most_common(3))}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Synthetic RSS/Atom server and collector load test")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("serve", help="run the feed server in the foreground")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8765)
+
+    lt = sub.add_parser("loadtest", help="serve in-process and hammer the collector concurrently")
+    lt.add_argument("--port", type=int, default=0)
+    lt.add_argument("--feeds", type=int, default=100, help="number of synthetic feed URLs")
+    lt.add_argument("--entries", type=int, default=50, help="entries per feed")
+    lt.add_argument("--size", type=int, default=400, help="approx. summary bytes per entry")
+    lt.add_argument("--latency", type=float, default=0.05, help="server-side delay per request (s)")
+    lt.add_argument("--concurrency", type=int, default=8)
+    lt.add_argument("--timeout", type=float, default=5.0, help="client socket timeout (s)")
+    lt.add_argument("--parse-workers", type=int, default=0,
+                    help="measure collect_parallel with N parse processes instead of fetch_feed")
+    lt.add_argument("--faults", default="p304=0.05,p5xx=0.05,timeout=0.02,drip=0.05,malformed=0.05",
+                    help="comma list of fault=rate (p304, p5xx, timeout, drip, malformed)")
+    args = ap.parse_args()
+
+    if args.cmd == "serve":
+        srv = ThreadingHTTPServer((args.host, args.port), FeedHandler)
+        print(f"serving synthetic feeds on http://{args.host}:{args.port}/feed")
+        try:
+            srv.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        loadtest(args)
+
+
+if __name__ == "__main__":
+    main()
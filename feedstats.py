@@ -0,0 +1,131 @@
+# feedstats.py
+# Per-feed yield statistics across runs and the adaptive scheduler built on them:
+# low-yield or unchanged feeds back off (skipped for 1, 2, 4, ... days), and the
+# per-run fetch budget (MAX_ITEMS) is split in favour of feeds whose items
+# survive filtering, are new, and end up as picks.
+import datetime
+import hashlib
+import json
+from typing import Dict, List, Optional, Tuple
+
+from atomicio import atomic_write
+from config import (
+    FEEDSTATS_PATH, FEEDSTATS_HISTORY, FEEDSTATS_MIN_RUNS,
+    FEEDSTATS_MAX_BACKOFF_DAYS, FEEDSTATS_MIN_CAP,
+)
+
+_SEEN_MAX = 200  # ids remembered per feed for the new-item rate
+
+
+def _shift(date: str, days: int) -> str:
+    return (datetime.date.fromisoformat(date) + datetime.timedelta(days=days)).isoformat()
+
+
+class FeedStats:
+    """JSON-backed store: url -> {"runs": [...], "seen": [...], "fingerprint", "backoff", "next_due"}.
+
+    Each run entry holds fetched, kept (after filter_by_domain), new (ids not
+    seen last run), picks and latency (seconds); only the last
+    FEEDSTATS_HISTORY runs are kept. A failed fetch is stored as a run with
+    "error" and left out of the yield numbers. Recording the same date again
+    replaces that date's run instead of adding another.
+    """
+
+    def __init__(self, path: str = FEEDSTATS_PATH, history: int = FEEDSTATS_HISTORY):
+        self.path = path
+        self.history = max(1, history)
+        self.feeds: Dict[str, Dict] = {}
+
+    def load(self) -> "FeedStats":
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.feeds = json.load(f).get("feeds", {})
+        except (OSError, ValueError):
+            self.feeds = {}
+        return self
+
+    def save(self) -> None:
+        atomic_write(self.path, json.dumps({"feeds": self.feeds}, ensure_ascii=False, indent=1))
+
+    def productivity(self, url: str) -> Optional[float]:
+        """Mean of (kept × new-rate + 2 × picks) over recent runs; None while warming up."""
+        runs = [r for r in self.feeds.get(url, {}).get("runs", []) if not r.get("error")]
+        if len(runs) < FEEDSTATS_MIN_RUNS:
+            return None
+        recent = runs[-FEEDSTATS_MIN_RUNS:]
+        total = 0.0
+        for r in recent:
+            new_rate = r["new"] / r["fetched"] if r["fetched"] else 0.0
+            total += r["kept"] * new_rate + 2 * r["picks"]
+        return total / len(recent)
+
+    def plan(self, urls: List[str], date: str, budget: int) -> List[Tuple[str, int, str]]:
+        """Return [(url, cap, reason)]; cap == 0 means skip this run."""
+        decisions, weights = [], {}
+        for u in urls:
+            st = self.feeds.get(u, {})
+            due = st.get("next_due", "")
+            if due and date < due:
+                decisions.append((u, 0, f"skip: backoff {st.get('backoff', 0)}d until {due}"))
+                continue
+            p = self.productivity(u)
+            weights[u] = 1.0 + (p if p is not None else 1.0)
+            decisions.append((u, None, "warm-up" if p is None else f"yield {p:.2f}"))
+
+        total = sum(weights.values()) or 1.0
+        out = []
+        for u, cap, reason in decisions:
+            if cap is None:
+                cap = max(FEEDSTATS_MIN_CAP, round(budget * weights[u] / total))
+                reason = f"poll: {reason}"
+            out.append((u, cap, reason))
+        return out
+
+    def record(self, url: str, date: str, ids: List[str], kept: int, picks: int,
+               latency: Optional[float], error: str = "") -> str:
+        """Store this run's numbers for `url` and update its backoff; returns a log note.
+
+        With `error` and no ids the fetch failed: the run is kept for the record
+        but the seen ids, fingerprint and backoff are left alone, so an outage
+        is not mistaken for an empty feed.
+        """
+        st = self.feeds.setdefault(url, {"runs": [], "seen": [], "fingerprint": "", "backoff": 0, "next_due": ""})
+        if st["runs"] and st["runs"][-1]["date"] == date:
+            # re-run of the same date: undo that run before recording this one
+            st["runs"].pop()
+            st.update(st.pop("before", {}))
+        st["before"] = {k: st[k] for k in ("seen", "fingerprint", "backoff", "next_due")}
+
+        if error and not ids:
+            st["runs"] = (st["runs"] + [{
+                "date": date, "error": error,
+                "latency": round(latency, 3) if latency is not None else None,
+            }])[-self.history:]
+            failures = 0
+            for r in reversed(st["runs"]):
+                if not r.get("error"):
+                    break
+                failures += 1
+            return f"failed: {error} ({failures} in a row); no backoff"
+
+        prev = set(st["seen"])
+        new = sum(1 for i in ids if i not in prev)
+        fingerprint = hashlib.md5("".join(sorted(ids)).encode()).hexdigest()
+        unchanged = bool(ids) and fingerprint == st["fingerprint"]
+
+        st["runs"] = (st["runs"] + [{
+            "date": date, "fetched": len(ids), "kept": kept, "new": new, "picks": picks,
+            "latency": round(latency, 3) if latency is not None else None,
+        }])[-self.history:]
+        st["seen"] = ids[:_SEEN_MAX]
+        st["fingerprint"] = fingerprint
+
+        p = self.productivity(url)
+        if unchanged or not ids or (p is not None and p == 0):
+            st["backoff"] = min(FEEDSTATS_MAX_BACKOFF_DAYS, max(1, st["backoff"] * 2))
+            st["next_due"] = _shift(date, st["backoff"])
+            why = "unchanged" if unchanged else ("empty" if not ids else "no yield")
+            return f"{why}; back off {st['backoff']}d (next {st['next_due']})"
+        st["backoff"] = 0
+        st["next_due"] = ""
+        return f"fetched {len(ids)}, kept {kept}, new {new}, picks {picks}"
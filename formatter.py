@@ -1,10 +1,23 @@
 from typing import Dict, Optional
 
-def to_markdown(picks: Dict[str, Dict], date: Optional[str] = None) -> str:
-    header = f"# Rumor Mill — Daily Digest ({date})\n" if date else "# Rumor Mill — Daily Digest\n"
+_BUILTIN_ORDER = ("ai", "finance", "science")
+
+def to_markdown(picks: Dict[str, Dict], date: Optional[str] = None, phase: Optional[str] = None,
+                title: str = "Daily Digest") -> str:
+    """Render picks as the daily digest.
+
+    Built-in domains come first in their usual order, then any other sections
+    (e.g. profiles) in insertion order. An HTML comment under each section
+    records which variant (heuristic/agent) produced it; when `phase` is given
+    ("heuristic" or "final"), another one records the digest phase.
+    """
+    header = f"# Rumor Mill — {title} ({date})\n" if date else f"# Rumor Mill — {title}\n"
     lines = [header]
+    if phase:
+        lines.insert(0, f"<!-- rumor-mill: phase={phase} -->")
 
-    for domain in ("ai", "finance", "science"):
+    order = [d for d in _BUILTIN_ORDER if d in picks] + [d for d in picks if d not in _BUILTIN_ORDER]
+    for domain in order:
         p = picks.get(domain)
         if not p:
             continue
@@ -13,6 +26,7 @@ def to_markdown(picks: Dict[str, Dict], date: Optional[str] = None) -> str:
         count = len(srcs)
 
         lines.append(f"## {domain.upper()}")
+        lines.append(f"<!-- section={domain} variant={p.get('variant', 'heuristic')} -->")
 
         title = p.get("title", "(no title)")
         conf = float(p.get("confidence", 0.0))
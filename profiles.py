@@ -0,0 +1,141 @@
+# profiles.py
+# User-defined topic profiles (per-team watchlists) compiled into an inverted
+# index, so one pass over the shared scored item stream routes every item to
+# all profiles it matches. Cost is O(item tokens + matches), not items × profiles.
+import json
+import re
+from typing import Dict, Iterable, List
+
+from collectors import make_id
+from config import DOMAINS
+
+_tok_re = re.compile(r"[a-z0-9]+")
+_name_re = re.compile(r"^[a-z0-9][a-z0-9_-]*$")
+
+
+def _tokens(text: str) -> List[str]:
+    return _tok_re.findall((text or "").lower())
+
+
+def load_profiles(path: str) -> List[Dict]:
+    """Read profiles from a JSON file: {"profiles": [{"name", "keywords", "excludes", "sources"}, ...]}.
+
+    `sources` lists config.DOMAINS keys and/or feed URLs; it defaults to every
+    configured domain. Anything else raises ValueError.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    profiles = data.get("profiles", []) if isinstance(data, dict) else data
+    out, names = [], set()
+    for p in profiles:
+        name = (p.get("name") or "").strip().lower()
+        if not _name_re.match(name):
+            raise ValueError(f"profile name {name!r} must match {_name_re.pattern}")
+        if name in names:
+            raise ValueError(f"duplicate profile name {name!r}")
+        keywords = [k for k in (p.get("keywords") or []) if _tokens(k)]
+        if not keywords:
+            raise ValueError(f"profile {name!r} has no keywords")
+        sources = p.get("sources") or list(DOMAINS)
+        unknown = [src for src in sources if src not in DOMAINS and "://" not in src]
+        if unknown:
+            raise ValueError(f"profile {name!r} has unknown sources {unknown}; "
+                             f"use feed URLs or one of {sorted(DOMAINS)}")
+        names.add(name)
+        out.append({
+            "name": name,
+            "title": p.get("title") or name,
+            "keywords": keywords,
+            "excludes": [k for k in (p.get("excludes") or []) if _tokens(k)],
+            "sources": sources,
+        })
+    return out
+
+
+def _source_urls(p: Dict) -> List[str]:
+    return [u for src in p["sources"] for u in DOMAINS.get(src, [src] if "://" in src else [])]
+
+
+def profile_feeds(profiles: List[Dict]) -> List[str]:
+    """Union of feed URLs across profiles, in first-seen order (each feed fetched once)."""
+    return list(dict.fromkeys(u for p in profiles for u in _source_urls(p)))
+
+
+class ProfileIndex:
+    """Inverted index: token -> [(profile idx, phrase)] for keywords and excludes.
+
+    Multi-word phrases are indexed under their first token and confirmed
+    against the item's token string only when that token occurs.
+    """
+
+    def __init__(self, profiles: List[Dict]):
+        self.profiles = profiles
+        self._include: Dict[str, List[tuple]] = {}
+        self._exclude: Dict[str, List[tuple]] = {}
+        self._by_feed: Dict[str, set] = {}  # feed url -> profiles that subscribe to it
+        for i, p in enumerate(profiles):
+            for u in _source_urls(p):
+                self._by_feed.setdefault(u, set()).add(i)
+            for kw in p["keywords"]:
+                self._add(self._include, i, kw)
+            for kw in p["excludes"]:
+                self._add(self._exclude, i, kw)
+
+    @staticmethod
+    def _add(index: Dict[str, List[tuple]], i: int, phrase: str) -> None:
+        toks = _tokens(phrase)
+        # single tokens need no confirmation; phrases carry a padded needle
+        needle = f" {' '.join(toks)} " if len(toks) > 1 else ""
+        index.setdefault(toks[0], []).append((i, needle))
+
+    @staticmethod
+    def _hits(index: Dict[str, List[tuple]], uniq: set, joined: str, skip: set) -> set:
+        out = set()
+        for t in uniq:
+            for i, needle in index.get(t, ()):
+                if i in out or i in skip:
+                    continue
+                if not needle or needle in joined:
+                    out.add(i)
+        return out
+
+    def subscribers(self, feed: str) -> set:
+        """Profiles whose sources include `feed`."""
+        return self._by_feed.get(feed, set())
+
+    def match(self, text: str, feed: str = None) -> List[int]:
+        """Indices of profiles whose keywords hit `text` and whose excludes do not.
+
+        With `feed`, only profiles subscribed to that feed are considered.
+        """
+        allowed = self.subscribers(feed) if feed is not None else None
+        if allowed is not None and not allowed:
+            return []
+        toks = _tokens(text)
+        uniq = set(toks)
+        joined = f" {' '.join(toks)} "
+        blocked = self._hits(self._exclude, uniq, joined, set())
+        hits = self._hits(self._include, uniq, joined, blocked)
+        return sorted(hits & allowed if allowed is not None else hits)
+
+
+def route(items: Iterable[Dict], index: ProfileIndex) -> Dict[str, List[Dict]]:
+    """One pass over scored items -> {profile name: [matching items]}.
+
+    Items are routed only to profiles subscribed to their `feed`, and
+    de-duplicated per profile, so an article seen in two feeds still reaches
+    every profile that subscribes to either of them.
+    """
+    out: Dict[str, List[Dict]] = {p["name"]: [] for p in index.profiles}
+    seen: Dict[str, set] = {p["name"]: set() for p in index.profiles}
+    for it in items:
+        text = f'{it["title"]} {it.get("summary","")}'
+        uid = None
+        for i in index.match(text, feed=it.get("feed", "")):
+            name = index.profiles[i]["name"]
+            uid = uid or make_id(it)
+            if uid in seen[name]:
+                continue
+            seen[name].add(uid)
+            out[name].append(it)
+    return out
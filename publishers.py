@@ -0,0 +1,201 @@
+# publishers.py
+# Resolve Google News redirect links (news.google.com/rss/articles/...) to the
+# real publisher URL + host, with a persistent, bounded cache so each link is
+# only resolved once across runs.
+import json
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from atomicio import atomic_write
+from config import (
+    PUBLISHER_CACHE_PATH, PUBLISHER_CACHE_MAX,
+    RESOLVE_PUBLISHERS, RESOLVE_CONCURRENCY, RESOLVE_TIMEOUT, RESOLVE_RETRY_HOURS,
+)
+
+_REDIRECT_HOSTS = {"news.google.com"}
+_TITLE_SUFFIX = re.compile(r"\s+[-–—|]\s+([^-–—|]{2,80})$")
+_CANONICAL_RE = re.compile(r'<link[^>]+rel=["\']canonical["\'][^>]+href=["\'](https?://[^"\']+)', re.I)
+_DATA_URL_RE = re.compile(r'data-n-au=["\'](https?://[^"\']+)', re.I)
+
+
+def host_of(url: str) -> str:
+    """Lower-cased host without a leading 'www.'; '' if the URL has none."""
+    h = (urlparse(url or "").hostname or "").lower()
+    return h[4:] if h.startswith("www.") else h
+
+
+def is_redirect(url: str) -> bool:
+    return host_of(url) in _REDIRECT_HOSTS
+
+
+def publisher_from_title(title: str) -> str:
+    """Google News titles end in ' - Publisher Name' (others use ' | '); return that name or ''."""
+    m = _TITLE_SUFFIX.search((title or "").strip())
+    return m.group(1).strip() if m else ""
+
+
+def strip_publisher(title: str) -> str:
+    """Title without the suffix publisher_from_title reads."""
+    return _TITLE_SUFFIX.sub("", (title or "").strip())
+
+
+class PublisherCache:
+    """LRU map: redirect URL -> {"url": canonical, "host": host}; plus publisher name -> host.
+
+    Failures are stored with "failed_at"/"tries" so they are retried after a cooldown.
+
+    Backed by a JSON file; both maps are trimmed to `max_entries` on save.
+    """
+
+    def __init__(self, path: str = PUBLISHER_CACHE_PATH, max_entries: int = PUBLISHER_CACHE_MAX):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.urls: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self.names: "OrderedDict[str, str]" = OrderedDict()
+        self._dirty = False
+
+    def load(self) -> "PublisherCache":
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        self.urls.update((k, v) for k, v in (data.get("urls") or {}).items() if isinstance(v, dict))
+        self.names.update((k, v) for k, v in (data.get("names") or {}).items() if isinstance(v, str))
+        return self
+
+    def get(self, link: str) -> Optional[Dict[str, str]]:
+        """Cached resolution, or None for a miss.
+
+        Failed resolutions count as misses again once their cooldown
+        (RESOLVE_RETRY_HOURS, doubled per failed try) has passed.
+        """
+        hit = self.urls.get(link)
+        if hit is None:
+            return None
+        if not hit.get("url") and "failed_at" in hit:
+            cooldown = RESOLVE_RETRY_HOURS * 3600 * 2 ** (hit.get("tries", 1) - 1)
+            if time.time() - hit["failed_at"] >= cooldown:
+                return None
+        self.urls.move_to_end(link)
+        return hit
+
+    def put(self, link: str, url: str, host: str) -> None:
+        entry = {"url": url, "host": host}
+        if not url:
+            prev = self.urls.get(link) or {}
+            entry["failed_at"] = time.time()
+            entry["tries"] = prev.get("tries", 0) + 1
+        self.urls[link] = entry
+        self.urls.move_to_end(link)
+        self._dirty = True
+
+    def host_for_name(self, name: str) -> str:
+        key = (name or "").strip().lower()
+        host = self.names.get(key, "")
+        if host:
+            self.names.move_to_end(key)
+        return host
+
+    def learn_name(self, name: str, host: str) -> None:
+        key = (name or "").strip().lower()
+        if key and host and self.names.get(key) != host:
+            self.names[key] = host
+            self.names.move_to_end(key)
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        while len(self.urls) > self.max_entries:
+            self.urls.popitem(last=False)
+        while len(self.names) > self.max_entries:
+            self.names.popitem(last=False)
+        atomic_write(self.path, json.dumps({"urls": self.urls, "names": self.names}, ensure_ascii=False))
+        self._dirty = False
+
+
+def _fetch_canonical(link: str) -> str:
+    """Follow redirects / read the landing page for the publisher URL; '' on failure."""
+    import requests
+    try:
+        r = requests.get(link, timeout=RESOLVE_TIMEOUT, allow_redirects=True,
+                         headers={"User-Agent": "rumor-mill/1.0"})
+    except Exception:
+        return ""
+    if r.url and not is_redirect(r.url):
+        return r.url
+    body = r.text or ""
+    for rx in (_DATA_URL_RE, _CANONICAL_RE):
+        m = rx.search(body)
+        if m and not is_redirect(m.group(1)):
+            return m.group(1)
+    return ""
+
+
+def resolve_publishers(items: List[Dict], cache: PublisherCache) -> List[Dict]:
+    """Annotate items in place with "host" and "canonical" (publisher URL when known).
+
+    Cheap sources first: direct links, the cache, the feed's <source> element and
+    the title suffix. Network resolution runs only for cache misses, with
+    bounded concurrency; successes are cached, failures are retried after a cooldown.
+    """
+    misses: Dict[str, List[Dict]] = {}
+    for it in items:
+        link = it.get("link", "") or ""
+        if not is_redirect(link):
+            it["canonical"] = link
+            it["host"] = host_of(link)
+            continue
+
+        name = it.get("publisher") or publisher_from_title(it.get("title", ""))
+        src_host = host_of(it.get("publisher_url", ""))
+        if name and src_host:
+            cache.learn_name(name, src_host)
+
+        hit = cache.get(link)
+        if hit is not None:
+            it["canonical"] = hit.get("url", "")
+            it["host"] = hit.get("host", "") or src_host or cache.host_for_name(name)
+            continue
+
+        it["canonical"] = ""
+        it["host"] = src_host or cache.host_for_name(name)
+        misses.setdefault(link, []).append(it)
+
+    if not misses:
+        return items
+
+    if RESOLVE_PUBLISHERS:
+        with ThreadPoolExecutor(max_workers=max(1, RESOLVE_CONCURRENCY)) as ex:
+            resolved = dict(zip(misses, ex.map(_fetch_canonical, list(misses))))
+    else:
+        resolved = {}
+
+    for link, group in misses.items():
+        url = resolved.get(link, "")
+        host = host_of(url) if url else group[0]["host"]
+        for it in group:
+            it["canonical"] = url
+            it["host"] = host or it["host"]
+        # Cache only what we actually tried to resolve, so enabling the network
+        # stage later still gets a chance at links seen in offline runs.
+        if RESOLVE_PUBLISHERS:
+            cache.put(link, url, host)
+    return items
+
+
+def iter_resolve_publishers(items: Iterable[Dict], cache: PublisherCache, batch: int = 32) -> Iterator[Dict]:
+    """Streaming resolve_publishers: resolve in small batches so network lookups stay concurrent."""
+    buf: List[Dict] = []
+    for it in items:
+        buf.append(it)
+        if len(buf) >= batch:
+            yield from resolve_publishers(buf, cache)
+            buf = []
+    if buf:
+        yield from resolve_publishers(buf, cache)
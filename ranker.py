@@ -1,7 +1,10 @@
 # ranker.py
-from typing import List, Dict
-from config import KEYWORDS, DOMAIN_KEYWORDS, DOMAIN_EXCLUDES, BAD_DOMAINS
-from collectors import make_id
+import heapq
+import itertools
+from collections import OrderedDict, deque
+from typing import List, Dict, Iterable, Iterator
+from config import KEYWORDS, DOMAIN_KEYWORDS, DOMAIN_EXCLUDES, BAD_DOMAINS, CLASSIFIER_DOMAIN_MIN
+from collectors import make_id, title_tokens
 
 def rumor_score(text: str) -> float:
     t = text.lower()
@@ -24,28 +27,151 @@ def _is_bad(link: str) -> bool:
     host = (link or "").lower()
     return any(bad in host for bad in BAD_DOMAINS)
 
-def score_and_dedupe(items: List[Dict]) -> List[Dict]:
-    """Assign rumor_score and remove duplicates by id."""
+def _text(it: Dict) -> str:
+    return f'{it["title"]} {it.get("summary","")}'
+
+def _batched(items: Iterable[Dict], n: int = 256) -> Iterator[List[Dict]]:
+    batch = []
+    for it in items:
+        batch.append(it)
+        if len(batch) >= n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _iter_unique(items: Iterable[Dict]) -> Iterator[Dict]:
     seen = set()
-    scored = []
     for it in items:
-        if _is_bad(it.get("link", "")):
-         continue
+        if _is_bad(it.get("canonical") or it.get("host") or it.get("link", "")):
+            continue
         uid = make_id(it)
         if uid in seen:
             continue
         seen.add(uid)
-        text = f'{it["title"]} {it.get("summary","")}'
-        it["rumor_score"] = rumor_score(text)
-        scored.append(it)
+        yield it
+
+def iter_score_and_dedupe(items: Iterable[Dict], model=None) -> Iterator[Dict]:
+    """Streaming score_and_dedupe: yield scored, unique items in arrival order (unsorted).
+
+    With a classifier.HashedLinearModel whose rumor head is trained, rumor_score
+    is the model's rumor probability, computed per batch instead of per item.
+    """
+    if model is None or not model.usable("rumor"):
+        for it in _iter_unique(items):
+            it["rumor_score"] = rumor_score(_text(it))
+            yield it
+        return
+    for batch in _batched(_iter_unique(items)):
+        for it, p in zip(batch, model.rumor([_text(it) for it in batch])):
+            it["rumor_score"] = float(p)
+            yield it
+
+def score_and_dedupe(items: List[Dict], model=None) -> List[Dict]:
+    """Assign rumor_score and remove duplicates by id."""
+    scored = list(iter_score_and_dedupe(items, model=model))
     scored.sort(key=lambda x: x["rumor_score"], reverse=True)
     return scored
 
-def filter_by_domain(domain: str, items: List[Dict]) -> List[Dict]:
+def filter_by_domain(domain: str, items: List[Dict], model=None) -> List[Dict]:
     """Keep only items whose text matches the domain guard words and not the excludes."""
-    out = []
+    return list(iter_filter_by_domain(domain, items, model=model))
+
+def domain_filter(domain: str, model=None) -> str:
+    """Which rule iter_filter_by_domain applies to `domain`: "classifier" or "keywords"."""
+    return "classifier" if model is not None and domain in model.domains else "keywords"
+
+def iter_filter_by_domain(domain: str, items: Iterable[Dict], model=None) -> Iterator[Dict]:
+    """Streaming filter_by_domain.
+
+    With a classifier.HashedLinearModel that has a trained head for `domain`, the
+    model's domain-fit probability (>= CLASSIFIER_DOMAIN_MIN) replaces the keyword lists.
+    Kept items are tagged with "filter" (see domain_filter), so classifier.py can
+    tell keyword labels from the model's own output.
+    """
+    how = domain_filter(domain, model)
+    if how == "keywords":
+        for it in items:
+            if _matches_domain(domain, _text(it)):
+                it["filter"] = how
+                yield it
+        return
+    for batch in _batched(items):
+        for it, p in zip(batch, model.domain_fit([_text(it) for it in batch], domain)):
+            it["domain_fit"] = round(float(p), 3)
+            if p >= CLASSIFIER_DOMAIN_MIN:
+                it["filter"] = how
+                yield it
+
+def _related(a: Dict, a_tok: set, b: Dict, b_tok: set) -> bool:
+    """Same publisher host or similar title (the grouping _heuristic_pick_one uses for sources)."""
+    if a.get("host") and a.get("host") == b.get("host"):
+        return True
+    if not a_tok or not b_tok:
+        return False
+    return len(a_tok & b_tok) / len(a_tok | b_tok) >= 0.5
+
+def stream_top_k(items: Iterable[Dict], k: int, members: int = 2) -> List[Dict]:
+    """Keep only the k best items by rumor_score (plus up to `members` related items each).
+
+    Returns the top k sorted by score (ties keep arrival order), followed by
+    their cluster members, so downstream code that reads the head of the list
+    (agent prompts, cluster_for_trace) and code that scans for same-host/similar
+    sources (_heuristic_pick_one) both see what they need.
+
+    Members are attached once the stream ends, from a side buffer of recent
+    non-top items (evicted or rejected): the last `members` per host, for at
+    most 4 * k hosts, plus the last k * members items overall for title
+    matches. Memory stays O(k * members); the grouping is approximate in that
+    a member pushed out of the buffer before the end is lost.
+    """
+    k = max(1, k)
+    heap = []  # min-heap of (score, -seq, seq); the worst candidate sits at heap[0]
+    kept: Dict[int, Dict] = {}  # seq -> item
+    by_host: "OrderedDict[str, deque]" = OrderedDict()  # host -> recent non-top (seq, item)
+    recent: deque = deque(maxlen=k * max(0, members))  # recent non-top (seq, item), any host
+    seq = itertools.count()
+
+    def spill(n: int, it: Dict) -> None:
+        if members <= 0:
+            return
+        recent.append((n, it))
+        host = it.get("host")
+        if not host:
+            return
+        if host not in by_host:
+            by_host[host] = deque(maxlen=members)
+            if len(by_host) > 4 * k:
+                by_host.popitem(last=False)
+        by_host[host].append((n, it))
+        by_host.move_to_end(host)
+
     for it in items:
-        text = f'{it["title"]} {it.get("summary","")}'
-        if _matches_domain(domain, text):
-            out.append(it)
-    return out
+        n = next(seq)
+        key = (it.get("rumor_score", 0.0), -n, n)
+        if len(heap) < k:
+            heapq.heappush(heap, key)
+            kept[n] = it
+        elif key > heap[0]:
+            _, _, evicted = heapq.heapreplace(heap, key)
+            spill(evicted, kept.pop(evicted))
+            kept[n] = it
+        else:
+            spill(n, it)
+
+    order = sorted(heap, reverse=True)
+    top = [kept[n] for _, _, n in order]
+    if members <= 0:
+        return top
+    pool = {n: it for n, it in recent}
+    for q in by_host.values():
+        pool.update(q)
+    pool_tok = {n: title_tokens(it.get("title", "")) for n, it in pool.items()}
+    used, extra = set(), []
+    for rep in top:
+        rep_tok = title_tokens(rep.get("title", ""))
+        group = [n for n in sorted(pool) if n not in used
+                 and _related(rep, rep_tok, pool[n], pool_tok[n])][:members]
+        used.update(group)
+        extra.extend(pool[n] for n in group)
+    return top + extra
@@ -3,15 +3,79 @@ import pathlib
 import datetime
 import json
 import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 
 from dotenv import load_dotenv
 from tqdm import tqdm
 
-from collectors import collect_from_sources
-from ranker import score_and_dedupe, filter_by_domain
-from agent import pick_one, cluster_for_trace, choose_with_agent
+from collectors import iter_from_sources, collect_parallel, make_id
+from ranker import (
+    score_and_dedupe, filter_by_domain, iter_filter_by_domain, iter_score_and_dedupe, stream_top_k, domain_filter,
+)
+from agent import pick_one, cluster_for_trace, choose_with_agent, _heuristic_pick_one
 from formatter import to_markdown
-from config import DOMAINS, MAX_ITEMS
+from atomicio import atomic_write
+from publishers import PublisherCache, resolve_publishers, iter_resolve_publishers
+from feedstats import FeedStats
+from classifier import load_model
+from profiles import load_profiles, profile_feeds, ProfileIndex, route
+from config import DOMAINS, MAX_ITEMS, PROFILES_PATH, PROFILE_TOP_K, CLASSIFIER_PATH
+
+
+def run_profiles(path: str, date: str, outdir: pathlib.Path, dry_run: bool, log, parse_workers: int = 0,
+                 model=None) -> dict:
+    """Profile mode: fetch the union of profile feeds once, score/dedupe once, route
+    every item through the inverted index, then pick + render one digest per profile."""
+    profiles = load_profiles(path)
+    index = ProfileIndex(profiles)
+    urls = profile_feeds(profiles)
+    log(f"[profiles] {len(profiles)} profiles over {len(urls)} feeds from {path}")
+
+    publisher_cache = PublisherCache().load()
+    if parse_workers:
+        errors = {}
+        fetched = collect_parallel(urls, cap=MAX_ITEMS, parse_workers=parse_workers, errors=errors)
+        for u, err in errors.items():
+            log(f"[collect] error {u}: {err}")
+        feed_entries = lambda u: fetched[u]  # noqa: E731
+    else:
+        feed_entries = lambda u: iter_from_sources([u], cap=MAX_ITEMS)  # noqa: E731
+    # score/dedupe within each feed; route() dedupes per profile, so an article
+    # carried by two feeds still reaches the profiles subscribed to either one
+    scored = (
+        it for u in tqdm(urls, desc="Fetching profiles")
+        for it in iter_score_and_dedupe(iter_resolve_publishers(feed_entries(u), publisher_cache), model=model)
+    )
+    routed = route(scored, index)
+
+    picks = {}
+    candidates_dump = {}
+    for p in profiles:
+        name = p["name"]
+        cands = stream_top_k(iter(routed[name]), k=PROFILE_TOP_K)
+        log(f"[{name}] matched {len(routed[name])} → kept {len(cands)}")
+        candidates_dump[name] = cands
+        if not cands:
+            continue
+        pick = pick_one(name, cands)
+        if pick:
+            picks[name] = pick
+            md = to_markdown({name: pick}, date=date, title=p["title"])
+            if not dry_run:
+                outfile = outdir / f"{date}.{name}.md"
+                atomic_write(outfile, md)
+                log(f"[write] {outfile}")
+
+    if not dry_run:
+        jsonfile = outdir / f"{date}.profiles.json"
+        jsonfile.write_text(json.dumps(candidates_dump, ensure_ascii=False, indent=2), encoding="utf-8")
+        log(f"[write] {jsonfile}")
+        publisher_cache.save()
+    else:
+        log("(dry-run: not writing files)")
+    return picks
 
 
 def main():
@@ -24,6 +88,21 @@ def main():
     ap.add_argument("--verbose", action="store_true", help="extra logs (counts + sample titles)")
     ap.add_argument("--log-file", default=None, help="optional: write a run log to this file")
     ap.add_argument("--picks", type=int, default=3, help="Number of AI stories to select (top-k)")
+    ap.add_argument("--two-phase", action="store_true",
+                    help="write a heuristic digest right after scoring, then rewrite it with agent picks")
+    ap.add_argument("--stream", action="store_true",
+                    help="stream entries through filter/dedupe and keep only the top-k per domain")
+    ap.add_argument("--top-k", type=int, default=15,
+                    help="with --stream: candidates kept per domain (plus related cluster members)")
+    ap.add_argument("--profiles", nargs="?", const=PROFILES_PATH, default=None,
+                    help=f"run user-defined topic profiles from a JSON file (default {PROFILES_PATH}) "
+                         "and write one digest per profile")
+    ap.add_argument("--parse-workers", type=int, default=0,
+                    help="download feeds concurrently and parse them in N worker processes (0 = in-process)")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="use per-feed yield stats to skip/back off low-yield feeds and split MAX_ITEMS by yield")
+    ap.add_argument("--classifier", nargs="?", const=CLASSIFIER_PATH, default=None,
+                    help=f"score rumor-likelihood and domain fit with a trained weight file (default {CLASSIFIER_PATH})")
     args = ap.parse_args()
 
     if args.log_file:
@@ -38,6 +117,7 @@ def main():
     outfile = outdir / f"{date}.md"
     jsonfile = outdir / f"{date}.raw.json"
     clustersfile = outdir / f"{date}.clusters.json"
+    droppedfile = outdir / f"{date}.dropped.json"
 
     def log(msg: str):
         print(msg)
@@ -45,6 +125,25 @@ def main():
             with open(args.log_file, "a", encoding="utf-8") as f:
                 f.write(msg + "\n")
 
+    model = None
+    if args.classifier:
+        model = load_model(args.classifier)
+        if model is None:
+            log(f"[classifier] WARNING: no model at {args.classifier} (or numpy missing); using keyword scoring")
+        else:
+            log(f"[classifier] loaded {args.classifier} heads={model.heads}")
+            untrained = [h for h in model.heads if not model.usable(h)]
+            if untrained:
+                log(f"[classifier] untrained heads (keyword fallback): {', '.join(untrained)}")
+
+    if args.profiles:
+        picks = run_profiles(args.profiles, date, outdir, args.dry_run, log, args.parse_workers, model=model)
+        if not picks:
+            log("[fatal] no profile produced a pick; exiting 2")
+            raise SystemExit(2)
+        print(to_markdown(picks, date=date, title="Profile Digests"))
+        return
+
     # === helper: convert agent indices into final objects and compose a single Markdown block ===
     def _materialize_ai_picks(candidates: list, picks_list: list) -> list:
         out = []
@@ -58,78 +157,203 @@ def main():
                 "summary": it.get("summary") or it.get("snippet") or "",
                 "rationale": (p.get("rationale") or "").strip(),
                 "confidence": float(p.get("confidence", 0.5)),
-                "link": it.get("link", ""),
+                "link": it.get("canonical") or it.get("link", ""),
                 "source": it.get("source", ""),
             })
         return out
 
+    use_agent = (os.getenv("USE_AGENT", "").lower() in {"1", "true", "yes", "y"})
+
+    # === helper: the (slow) agent-backed pick for one domain; may fall back to heuristic ===
+    def _final_pick(d: str, scored: list):
+        if d == "ai" and use_agent:
+            agent_sel = choose_with_agent(domain="ai", candidates=scored, k=args.picks)
+            final_ai = _materialize_ai_picks(scored, agent_sel)
+            if final_ai:
+                # Compose into a single pick dict so formatter doesn't need changes
+                lines = []
+                total_conf = 0.0
+                for n, it in enumerate(final_ai, 1):
+                    title = it["title"]
+                    rationale = it.get("rationale", "")
+                    conf = float(it.get("confidence", 0.0) or 0.0)
+                    link = it.get("link", "")
+                    total_conf += conf
+                    lines.append(f"{n}. {title} — {rationale} (conf {conf:.2f})  {link}")
+                avg_conf = round(total_conf / max(1, len(final_ai)), 2)
+                return {
+                    "title": f"AI — Today’s {len(final_ai)} rumors",
+                    "summary": "\n".join(lines),
+                    "rationale": "Agentic top-k selection composed into a single block.",
+                    "confidence": avg_conf,
+                    "sources": [{"title": it["title"], "url": it.get("link", "")} for it in final_ai[:3]],
+                    "variant": "agent",
+                }
+            log(f"[{d}] agent returned no picks; falling back to heuristic")
+            return pick_one(d, scored)
+        pick = pick_one(d, scored)
+        if not pick:
+            log(f"[{d}] WARNING: no representative pick after scoring")
+        return pick
+
+    publisher_cache = PublisherCache().load()
+
     picks = {}
     raw_dump = {}
+    dropped_dump = {}  # off-topic negatives for classifier.py (list mode only)
     clusters_dump = {}
 
+    # two-phase: agent calls start per domain as soon as it is scored and run
+    # while later domains are still fetching; the heuristic digest is written first.
+    pool = ThreadPoolExecutor(max_workers=max(1, len(args.domains))) if args.two_phase else None
+    pending = {}
+
+    # per-feed fetch caps: an even split of each domain's MAX_ITEMS, or the adaptive
+    # scheduler's plan; a feed listed under several domains gets the largest cap
+    feed_stats = FeedStats().load() if args.adaptive else None
+    caps = {}
+    for d in args.domains:
+        urls = DOMAINS.get(d, [])
+        if feed_stats is not None:
+            for u, cap, reason in feed_stats.plan(urls, date, budget=MAX_ITEMS):
+                caps[u] = max(caps.get(u, 0), cap)
+                log(f"[sched] {d} {reason} cap={cap} {u}")
+        else:
+            for u in urls:
+                caps[u] = max(caps.get(u, 0), max(1, MAX_ITEMS // max(1, len(urls))))
+
+    # split collector: download every feed up front on threads, parse on a process pool
+    prefetched = None
+    timings = {}
+    fetch_errors = {}       # feed url -> why its fetch/parse failed
+    if args.parse_workers:
+        all_urls = [u for u, cap in caps.items() if cap > 0]
+        prefetched = collect_parallel(all_urls, cap=MAX_ITEMS, parse_workers=args.parse_workers,
+                                      timings=timings, errors=fetch_errors)
+        log(f"[collect] {sum(len(v) for v in prefetched.values())} entries from {len(prefetched)} feeds "
+            f"({args.parse_workers} parse workers, {len(fetch_errors)} with errors)")
+        for u, err in fetch_errors.items():
+            log(f"[collect] error {u}: {err}")
+
+    shared = {u for u, n in Counter(u for d in args.domains for u in DOMAINS.get(d, [])).items() if n > 1}
+    fetched_cache = {}      # feed url -> entries, for feeds listed under several domains
+    fetched_ids = {}        # feed url -> ids fetched this run (--adaptive only)
+    kept_by_feed = {}       # feed url -> (link, title) of entries some domain kept (--adaptive only)
+
+    def _fetch(u: str):
+        """Yield up to caps[u] entries of feed `u`, fetching each feed once per run.
+
+        Entries of feeds listed under several domains are cached and handed out
+        as copies (later stages annotate items in place). Latency and ids for
+        feed stats (--adaptive) are noted on the first fetch only.
+        """
+        cap = caps.get(u, 0)
+        if cap <= 0:
+            return
+        if u in fetched_cache:
+            for it in fetched_cache[u]:
+                yield dict(it)
+            return
+        t0 = time.perf_counter()
+        if prefetched is not None:
+            src = prefetched.get(u, [])[:cap]
+        else:
+            src = iter_from_sources([u], cap=cap, errors=fetch_errors)
+        ids = None
+        if feed_stats is not None and u not in fetched_ids:
+            ids = fetched_ids[u] = []
+        keep = [] if u in shared else None
+        for it in src:
+            timings.setdefault(u, time.perf_counter() - t0)
+            if ids is not None:
+                ids.append(make_id(it))
+            if keep is not None:
+                keep.append(it)
+                it = dict(it)
+            yield it
+        timings.setdefault(u, time.perf_counter() - t0)
+        if keep is not None:
+            fetched_cache[u] = keep
+        if prefetched is None and u in fetch_errors:
+            log(f"[collect] error {u}: {fetch_errors[u]}")
+
+    def _count_kept(items):
+        if feed_stats is None:
+            yield from items
+            return
+        for it in items:
+            kept_by_feed.setdefault(it.get("feed", ""), set()).add((it.get("link", ""), it["title"]))
+            yield it
+
     for d in args.domains:
         try:
             urls = DOMAINS.get(d, [])
             if not urls:
                 log(f"[{d}] WARNING: no sources configured")
                 continue
-            raw = []
-            for u in tqdm(urls, desc=f"Fetching {d}"):
-                raw.extend(
-                    collect_from_sources(
-                        [u],
-                        cap=max(1, MAX_ITEMS // max(1, len(urls)))
-                    )
-                )
-
-            before = len(raw)
-            raw = filter_by_domain(d, raw)
-            after = len(raw)
-            log(f"[{d}] filtered {before} → {after}")
-
-            if args.verbose:
-                for sample in raw[:3]:
-                    log(f"  - {sample['title']}")
-
-            raw_dump[d] = raw
-
-            scored = score_and_dedupe(raw)
+            if args.stream:
+                counts = {"fetched": 0, "kept": 0}
+
+                def _count(items, key):
+                    for it in items:
+                        counts[key] += 1
+                        yield it
+
+                entries = (it for u in tqdm(urls, desc=f"Fetching {d}") for it in _fetch(u))
+                stream = _count(entries, "fetched")
+                stream = _count(_count_kept(iter_filter_by_domain(d, stream, model=model)), "kept")
+                stream = iter_resolve_publishers(stream, publisher_cache)
+                scored = stream_top_k(iter_score_and_dedupe(stream, model=model), k=args.top_k)
+                n_top = min(max(1, args.top_k), len(scored))
+                log(f"[{d}] filtered {counts['fetched']} → {counts['kept']} "
+                    f"(kept top {n_top} + {len(scored) - n_top} cluster members)")
+
+                if args.verbose:
+                    for sample in scored[:3]:
+                        log(f"  - {sample['title']}")
+
+                # only the retained candidates exist in streaming mode
+                raw_dump[d] = scored
+            else:
+                raw = []
+                for u in tqdm(urls, desc=f"Fetching {d}"):
+                    raw.extend(_fetch(u))
+
+                before = len(raw)
+                fetched = raw
+                raw = filter_by_domain(d, raw, model=model)
+                after = len(raw)
+                kept_ids = {id(it) for it in raw}
+                how = domain_filter(d, model)
+                dropped_dump[d] = [
+                    dict({k: it.get(k, "") for k in ("title", "summary", "link", "feed")}, filter=how)
+                    for it in fetched if id(it) not in kept_ids
+                ]
+                if feed_stats is not None:
+                    for it in raw:
+                        kept_by_feed.setdefault(it.get("feed", ""), set()).add((it.get("link", ""), it["title"]))
+                log(f"[{d}] filtered {before} → {after}")
+
+                raw = resolve_publishers(raw, publisher_cache)
+                if args.verbose:
+                    hosts = {it.get("host") for it in raw if it.get("host")}
+                    log(f"[{d}] publishers: {len(hosts)} hosts across {len(raw)} items")
+                    for sample in raw[:3]:
+                        log(f"  - {sample['title']}")
+
+                raw_dump[d] = raw
+
+                scored = score_and_dedupe(raw, model=model)
+
             clusters_dump[d] = cluster_for_trace(scored)
 
-            use_agent = (os.getenv("USE_AGENT", "").lower() in {"1", "true", "yes", "y"})
-            if d == "ai" and use_agent:
-                agent_sel = choose_with_agent(domain="ai", candidates=scored, k=args.picks)
-                final_ai = _materialize_ai_picks(scored, agent_sel)
-                if final_ai:
-                    # Compose into a single pick dict so formatter doesn't need changes
-                    lines = []
-                    total_conf = 0.0
-                    for n, it in enumerate(final_ai, 1):
-                        title = it["title"]
-                        rationale = it.get("rationale", "")
-                        conf = float(it.get("confidence", 0.0) or 0.0)
-                        link = it.get("link", "")
-                        total_conf += conf
-                        lines.append(f"{n}. {title} — {rationale} (conf {conf:.2f})  {link}")
-                    avg_conf = round(total_conf / max(1, len(final_ai)), 2)
-                    picks[d] = {
-                        "title": f"AI — Today’s {len(final_ai)} rumors",
-                        "summary": "\n".join(lines),
-                        "rationale": "Agentic top-k selection composed into a single block.",
-                        "confidence": avg_conf,
-                        "sources": [{"title": it["title"], "url": it.get("link", "")} for it in final_ai[:3]],
-                    }
-                else:
-                    log(f"[{d}] agent returned no picks; falling back to heuristic")
-                    pick = pick_one(d, scored)
-                    if pick:
-                        picks[d] = pick
+            if pool is not None:
+                picks[d] = _heuristic_pick_one(d, scored)
+                pending[d] = pool.submit(_final_pick, d, scored)
             else:
-                pick = pick_one(d, scored)
+                pick = _final_pick(d, scored)
                 if pick:
                     picks[d] = pick
-                else:
-                    log(f"[{d}] WARNING: no representative pick after scoring")
 
         except Exception as e:
             log(f"[{d}] ERROR: {e}")
@@ -142,18 +366,55 @@ def main():
             log("[fatal] picks is present but empty-ish; exiting 2")
             raise SystemExit(2)
     
-    md = to_markdown(picks, date=date)
+    md = to_markdown(picks, date=date, phase="heuristic" if pool is not None else None)
 
     if not args.dry_run:
-        outfile.write_text(md, encoding="utf-8")
+        atomic_write(outfile, md)
         jsonfile.write_text(json.dumps(raw_dump, ensure_ascii=False, indent=2), encoding="utf-8")
         clustersfile.write_text(json.dumps(clusters_dump, ensure_ascii=False, indent=2), encoding="utf-8")
         log(f"[write] {outfile}")
         log(f"[write] {jsonfile}")
         log(f"[write] {clustersfile}")
+        if dropped_dump:
+            droppedfile.write_text(json.dumps(dropped_dump, ensure_ascii=False, indent=2), encoding="utf-8")
+            log(f"[write] {droppedfile}")
+        publisher_cache.save()
     else:
         log("(dry-run: not writing files)")
 
+    if pool is not None:
+        for d, fut in pending.items():
+            try:
+                pick = fut.result()
+            except Exception as e:
+                log(f"[{d}] ERROR (agent phase): {e}; keeping heuristic section")
+                continue
+            if pick:
+                picks[d] = pick
+        pool.shutdown()
+
+        md = to_markdown(picks, date=date, phase="final")
+        if not args.dry_run:
+            atomic_write(outfile, md)
+            log(f"[rewrite] {outfile}")
+
+    if feed_stats is not None:
+        feed_of = {}
+        for items in raw_dump.values():
+            for it in items:
+                feed_of[it.get("link", "")] = it.get("feed", "")
+                if it.get("canonical"):
+                    feed_of[it["canonical"]] = it.get("feed", "")
+        picks_by_feed = Counter(
+            feed_of.get(s.get("url", ""), "") for p in picks.values() for s in (p.get("sources") or [])
+        )
+        for u, ids in fetched_ids.items():  # one record per feed, however many domains list it
+            note = feed_stats.record(u, date, ids, len(kept_by_feed.get(u, ())), picks_by_feed[u], timings.get(u),
+                                     error=fetch_errors.get(u, ""))
+            log(f"[sched] {u}: {note}")
+        if not args.dry_run:
+            feed_stats.save()
+
     print(md)
 
 
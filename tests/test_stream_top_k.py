@@ -0,0 +1,78 @@
+# tests/test_stream_top_k.py
+# stream_top_k must agree with the list path on the head of the list (a full
+# stable sort by rumor_score) and keep cluster members across evictions.
+#
+#   python -m unittest discover tests      (or: python -m pytest tests)
+import random
+import unittest
+
+from ranker import stream_top_k
+
+
+def _item(n, score, host="", title=None):
+    return {"n": n, "rumor_score": score, "host": host, "title": title or f"headline{n:04d}"}
+
+
+def _ns(items):
+    return [it["n"] for it in items]
+
+
+class StreamTopKTest(unittest.TestCase):
+
+    def test_top_k_matches_full_sort(self):
+        rng = random.Random(7)
+        for trial in range(50):
+            items = [_item(i, rng.choice([0.0, 0.33, 0.67, 1.0, rng.random()]), f"h{rng.randrange(20)}.com")
+                     for i in range(rng.randrange(1, 200))]
+            k = rng.randrange(1, 20)
+            expected = sorted(items, key=lambda it: it["rumor_score"], reverse=True)[:k]
+            got = stream_top_k(iter(items), k)
+            self.assertEqual(_ns(got[:len(expected)]), _ns(expected), f"trial {trial}, k={k}")
+
+    def test_ties_keep_arrival_order(self):
+        items = [_item(i, 0.5) for i in range(10)]
+        self.assertEqual(_ns(stream_top_k(iter(items), 4, members=0)), [0, 1, 2, 3])
+
+    def test_fewer_items_than_k(self):
+        items = [_item(0, 0.2), _item(1, 0.9)]
+        self.assertEqual(_ns(stream_top_k(iter(items), 5)), [1, 0])
+
+    def test_evicted_item_rejoins_as_member(self):
+        items = [
+            _item(0, 0.5, "b.com"),   # in the top 2 at first, evicted by 2
+            _item(1, 0.9, "b.com"),
+            _item(2, 0.95, "c.com"),
+            _item(3, 0.1, "b.com"),   # never in the top
+            _item(4, 0.2, "d.com"),   # unrelated to the top
+        ]
+        got = stream_top_k(iter(items), 2)
+        self.assertEqual(_ns(got[:2]), [2, 1])
+        self.assertEqual(_ns(got[2:]), [0, 3])
+
+    def test_member_arriving_before_its_representative(self):
+        items = [
+            _item(0, 0.9, "a.com"),
+            _item(1, 0.8, "b.com"),
+            _item(2, 0.1, "x.com", "Apple reportedly buying chip startup"),
+            _item(3, 0.85, "y.com", "Apple reportedly buying chip startup"),  # evicts 1
+        ]
+        got = stream_top_k(iter(items), 2)
+        self.assertEqual(_ns(got[:2]), [0, 3])
+        self.assertIn(2, _ns(got[2:]))
+        self.assertNotIn(1, _ns(got[2:]))  # evicted, but unrelated to either top item
+        self.assertEqual(len(got), len(set(_ns(got))))
+
+    def test_members_are_bounded(self):
+        items = [_item(i, i / 1000, "same.com") for i in range(1000)]
+        got = stream_top_k(iter(items), 3, members=2)
+        self.assertEqual(_ns(got[:3]), [999, 998, 997])
+        self.assertEqual(len(got), 3 + 3 * 2)
+        self.assertEqual(len(set(_ns(got))), len(got))
+
+    def test_no_members(self):
+        items = [_item(i, i / 10, "same.com") for i in range(10)]
+        self.assertEqual(_ns(stream_top_k(iter(items), 3, members=0)), [9, 8, 7])
+
+
+if __name__ == "__main__":
+    unittest.main()